@@ -1,33 +1,257 @@
 import os
 import re
+import sys
+import time
+import json
+import hmac
 import asyncio
 import tempfile
 import uuid
 import pathlib
 import subprocess
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import collections
+import contextlib
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
 from typing import Optional
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFile
 from telegram.constants import ChatAction
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 from yt_dlp import YoutubeDL
 
+TRACE_BUFFER_SIZE = 200
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_INTERVAL = 0.005
+
+# Per-job traces, newest last; old jobs fall off the end of the ring buffer
+_traces: collections.deque = collections.deque(maxlen=TRACE_BUFFER_SIZE)
+_traces_lock = threading.Lock()
+_profile_lock = threading.Lock()
+
+def _new_trace(action: str, url: str, chat_id: int) -> dict:
+    trace = {
+        "job_id": uuid.uuid4().hex[:12],
+        "action": action,
+        "url": url,
+        "chat_id": chat_id,
+        "started_at": time.time(),
+        "status": "running",
+        "duration": None,
+        "title": None,
+        "format": None,
+        "downloads": {},
+        "retries": 0,
+        "stages": [],
+        "error": None,
+    }
+    with _traces_lock:
+        _traces.append(trace)
+    return trace
+
+def _finish_trace(trace: dict, error: Optional[str] = None) -> None:
+    trace["status"] = "error" if error else "ok"
+    trace["error"] = error
+    trace["duration"] = round(time.time() - trace["started_at"], 3)
+    print(f"[{trace['job_id']}] {trace['action']} {trace['status']} in {trace['duration']}s")
+
+@contextlib.contextmanager
+def _trace_stage(trace: Optional[dict], name: str):
+    # Yields a dict the caller can fill with extra fields (bytes, flags...)
+    stage = {"name": name}
+    t0 = time.monotonic()
+    try:
+        yield stage
+    finally:
+        stage["seconds"] = round(time.monotonic() - t0, 3)
+        if trace is not None:
+            trace["stages"].append(stage)
+
+def _traces_json(job_id: Optional[str] = None, limit: int = TRACE_BUFFER_SIZE) -> Optional[bytes]:
+    with _traces_lock:
+        if job_id is not None:
+            for t in _traces:
+                if t["job_id"] == job_id:
+                    return json.dumps(t, indent=2).encode("utf-8")
+            return None
+        recent = list(_traces)[::-1][:limit]
+        return json.dumps(recent, indent=2).encode("utf-8")
+
+class _TraceLogger:
+    """yt-dlp logger that counts retries into the job trace."""
+
+    def __init__(self, trace: Optional[dict]):
+        self.trace = trace
+        self.prefix = f"[{trace['job_id']}] " if trace else ""
+
+    def _count_retry(self, msg: str) -> None:
+        if self.trace is not None and "Retrying" in msg:
+            self.trace["retries"] += 1
+
+    def debug(self, msg: str) -> None:
+        self._count_retry(msg)
+
+    def info(self, msg: str) -> None:
+        pass
+
+    def warning(self, msg: str) -> None:
+        self._count_retry(msg)
+        print(f"{self.prefix}{msg}")
+
+    def error(self, msg: str) -> None:
+        print(f"{self.prefix}{msg}")
+
+def _progress_hook(trace: Optional[dict]):
+    prefix = f"[{trace['job_id']}] " if trace else ""
+
+    def progress_hook(d):
+        if trace is not None and d['status'] in ('downloading', 'finished'):
+            name = pathlib.Path(d.get('filename') or 'unknown').name
+            trace["downloads"][name] = {
+                "bytes": d.get('downloaded_bytes'),
+                "total_bytes": d.get('total_bytes') or d.get('total_bytes_estimate'),
+                "elapsed": round(d.get('elapsed') or 0, 3),
+                "status": d['status'],
+            }
+        if d['status'] == 'downloading':
+            percent = d.get('_percent_str', 'Unknown')
+            speed = d.get('_speed_str', 'Unknown')
+            eta = d.get('_eta_str', 'Unknown')
+            print(f"{prefix}Downloading: {percent} at {speed}, ETA: {eta}")
+    return progress_hook
+
+def _run_ydl(url: str, ydl_opts: dict, trace: Optional[dict] = None) -> str:
+    ydl_opts = dict(ydl_opts, progress_hooks=[_progress_hook(trace)], logger=_TraceLogger(trace))
+    with YoutubeDL(ydl_opts) as ydl:
+        # Extract video info first to get the title
+        with _trace_stage(trace, "extract_info"):
+            info = ydl.extract_info(url, download=False)
+        video_title = info.get('title', 'Unknown Title')
+        if trace is not None:
+            trace["title"] = video_title
+            trace["format"] = {
+                "requested": ydl_opts.get("format"),
+                "chosen": info.get("format") or info.get("format_id"),
+                "ext": info.get("ext"),
+            }
+        # Now download the media
+        with _trace_stage(trace, "download"):
+            ydl.download([url])
+    return video_title
+
+def _sample_profile(seconds: float, interval: float = PROFILE_INTERVAL, top: int = 25) -> str:
+    """Sample every thread's stack for `seconds` and return a hot-path report."""
+    # cProfile only sees the thread it runs in; downloads block the bot's
+    # event loop thread, so sample all threads from the outside instead.
+    me = threading.get_ident()
+    self_hits = collections.Counter()
+    total_hits = collections.Counter()
+    ticks = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_name, code.co_filename, code.co_firstlineno)
+                if leaf:
+                    self_hits[key] += 1
+                    leaf = False
+                if key not in seen:
+                    total_hits[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+        ticks += 1
+        time.sleep(interval)
+
+    def fmt(counter: collections.Counter) -> list[str]:
+        return [
+            f"  {100.0 * n / max(ticks, 1):6.1f}%  {name} ({filename}:{lineno})"
+            for (name, filename, lineno), n in counter.most_common(top)
+        ]
+
+    lines = [
+        f"Sampled {ticks} ticks over {seconds:g}s (every {interval * 1000:g}ms)",
+        "Percentages are per tick summed over all threads, so they can exceed 100%",
+        "",
+        "Self time:",
+    ]
+    lines += fmt(self_hits)
+    lines += ["", "Cumulative time:"]
+    lines += fmt(total_hits)
+    return "\n".join(lines) + "\n"
+
 # Health check server
 class HealthCheckHandler(BaseHTTPRequestHandler):
     def do_GET(self):
-        if self.path == '/health':
-            self.send_response(200)
-            self.send_header('Content-type', 'text/plain')
-            self.end_headers()
-            self.wfile.write(b'Healthy')
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip('/') or '/'
+        params = parse_qs(parsed.query)
+        if path == '/health':
+            self._reply(200, b'Healthy')
+        elif path == '/traces' or path.startswith('/traces/'):
+            if not self._is_admin():
+                return
+            if path == '/traces':
+                try:
+                    limit = int(params.get('limit', [TRACE_BUFFER_SIZE])[0])
+                except ValueError:
+                    limit = TRACE_BUFFER_SIZE
+                self._reply(200, _traces_json(limit=max(limit, 0)), 'application/json')
+                return
+            body = _traces_json(job_id=path[len('/traces/'):])
+            if body is None:
+                self._reply(404, b'Unknown job id')
+            else:
+                self._reply(200, body, 'application/json')
+        elif path == '/profile':
+            if not self._is_admin():
+                return
+            try:
+                seconds = float(params.get('seconds', [PROFILE_DEFAULT_SECONDS])[0])
+            except ValueError:
+                seconds = PROFILE_DEFAULT_SECONDS
+            seconds = min(max(seconds, 1), PROFILE_MAX_SECONDS)
+            if not _profile_lock.acquire(blocking=False):
+                self._reply(409, b'A profile is already running')
+                return
+            try:
+                report = _sample_profile(seconds)
+            finally:
+                _profile_lock.release()
+            self._reply(200, report.encode('utf-8'))
         else:
             self.send_response(404)
             self.end_headers()
 
+    def _is_admin(self) -> bool:
+        # Traces carry user URLs and chat ids, so everything but /health
+        # needs ADMIN_TOKEN; with no token configured the routes don't exist.
+        admin_token = _get_token("ADMIN_TOKEN")
+        if not admin_token:
+            self._reply(404, b'')
+            return False
+        given = self.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(given.encode('utf-8'), admin_token.encode('utf-8')):
+            self._reply(403, b'Forbidden')
+            return False
+        return True
+
+    def _reply(self, code: int, body: bytes, content_type: str = 'text/plain') -> None:
+        self.send_response(code)
+        self.send_header('Content-type', content_type)
+        self.end_headers()
+        self.wfile.write(body)
+
 def start_health_server():
     try:
-        server = HTTPServer(('0.0.0.0', 10000), HealthCheckHandler)
+        # Threaded so a running /profile doesn't block /health checks
+        server = ThreadingHTTPServer(('0.0.0.0', 10000), HealthCheckHandler)
+        server.daemon_threads = True
         server.serve_forever()
     except Exception as e:
         print(f"Health server error: {e}")
@@ -105,55 +329,30 @@ def _has_ffmpeg() -> bool:
 def _sanitize_filename(name: str) -> str:
     return re.sub(r"[^a-zA-Z0-9._-]", "_", name)
 
-def _download_video(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path, str]:
+def _download_video(url: str, dirpath: pathlib.Path, trace: Optional[dict] = None) -> tuple[pathlib.Path, str]:
     base = _sanitize_filename(str(uuid.uuid4()))
     outtmpl = str(dirpath / (base + ".%(ext)s"))
-    video_title = "Unknown Title"
-    
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'Unknown')
-            speed = d.get('_speed_str', 'Unknown')
-            eta = d.get('_eta_str', 'Unknown')
-            print(f"Downloading: {percent} at {speed}, ETA: {eta}")
-    
     ydl_opts = {
         "format": "bestvideo[height<=480]+bestaudio/best[height<=480]/best",
         "merge_output_format": "mp4",
         "outtmpl": outtmpl,
         "noplaylist": True,
         "quiet": True,
-        "progress_hooks": [progress_hook],
     }
     
-    with YoutubeDL(ydl_opts) as ydl:
-        # Extract video info first to get the title
-        info = ydl.extract_info(url, download=False)
-        video_title = info.get('title', 'Unknown Title')
-        # Now download the video
-        ydl.download([url])
+    video_title = _run_ydl(url, ydl_opts, trace)
     
     files = list(dirpath.glob(base + ".*"))
     return files[0], video_title
 
-def _download_audio_high(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path, str]:
+def _download_audio_high(url: str, dirpath: pathlib.Path, trace: Optional[dict] = None) -> tuple[pathlib.Path, str]:
     base = _sanitize_filename(str(uuid.uuid4()))
     outtmpl = str(dirpath / (base + ".%(ext)s"))
-    video_title = "Unknown Title"
-    
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'Unknown')
-            speed = d.get('_speed_str', 'Unknown')
-            eta = d.get('_eta_str', 'Unknown')
-            print(f"Downloading: {percent} at {speed}, ETA: {eta}")
-    
     ydl_opts = {
         "format": "bestaudio/best",
         "outtmpl": outtmpl,
         "noplaylist": True,
         "quiet": True,
-        "progress_hooks": [progress_hook],
         "postprocessors": [
             {
                 "key": "FFmpegExtractAudio",
@@ -163,12 +362,7 @@ def _download_audio_high(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path,
         ],
     }
     
-    with YoutubeDL(ydl_opts) as ydl:
-        # Extract video info first to get the title
-        info = ydl.extract_info(url, download=False)
-        video_title = info.get('title', 'Unknown Title')
-        # Now download the audio
-        ydl.download([url])
+    video_title = _run_ydl(url, ydl_opts, trace)
     
     files = list(dirpath.glob(base + ".mp3"))
     if files:
@@ -176,24 +370,14 @@ def _download_audio_high(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path,
     files = list(dirpath.glob(base + ".*"))
     return files[0], video_title
 
-def _download_audio_medium(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path, str]:
+def _download_audio_medium(url: str, dirpath: pathlib.Path, trace: Optional[dict] = None) -> tuple[pathlib.Path, str]:
     base = _sanitize_filename(str(uuid.uuid4()))
     outtmpl = str(dirpath / (base + ".%(ext)s"))
-    video_title = "Unknown Title"
-    
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'Unknown')
-            speed = d.get('_speed_str', 'Unknown')
-            eta = d.get('_eta_str', 'Unknown')
-            print(f"Downloading: {percent} at {speed}, ETA: {eta}")
-    
     ydl_opts = {
         "format": "bestaudio/best",
         "outtmpl": outtmpl,
         "noplaylist": True,
         "quiet": True,
-        "progress_hooks": [progress_hook],
         "postprocessors": [
             {
                 "key": "FFmpegExtractAudio",
@@ -203,12 +387,7 @@ def _download_audio_medium(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Pat
         ],
     }
     
-    with YoutubeDL(ydl_opts) as ydl:
-        # Extract video info first to get the title
-        info = ydl.extract_info(url, download=False)
-        video_title = info.get('title', 'Unknown Title')
-        # Now download the audio
-        ydl.download([url])
+    video_title = _run_ydl(url, ydl_opts, trace)
     
     files = list(dirpath.glob(base + ".mp3"))
     if files:
@@ -216,24 +395,14 @@ def _download_audio_medium(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Pat
     files = list(dirpath.glob(base + ".*"))
     return files[0], video_title
 
-def _download_audio_low(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path, str]:
+def _download_audio_low(url: str, dirpath: pathlib.Path, trace: Optional[dict] = None) -> tuple[pathlib.Path, str]:
     base = _sanitize_filename(str(uuid.uuid4()))
     outtmpl = str(dirpath / (base + ".%(ext)s"))
-    video_title = "Unknown Title"
-    
-    def progress_hook(d):
-        if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'Unknown')
-            speed = d.get('_speed_str', 'Unknown')
-            eta = d.get('_eta_str', 'Unknown')
-            print(f"Downloading: {percent} at {speed}, ETA: {eta}")
-    
     ydl_opts = {
         "format": "worstaudio/worst",
         "outtmpl": outtmpl,
         "noplaylist": True,
         "quiet": True,
-        "progress_hooks": [progress_hook],
         "postprocessors": [
             {
                 "key": "FFmpegExtractAudio",
@@ -243,12 +412,7 @@ def _download_audio_low(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path,
         ],
     }
     
-    with YoutubeDL(ydl_opts) as ydl:
-        # Extract video info first to get the title
-        info = ydl.extract_info(url, download=False)
-        video_title = info.get('title', 'Unknown Title')
-        # Now download the audio
-        ydl.download([url])
+    video_title = _run_ydl(url, ydl_opts, trace)
     
     files = list(dirpath.glob(base + ".mp3"))
     if files:
@@ -256,8 +420,9 @@ def _download_audio_low(url: str, dirpath: pathlib.Path) -> tuple[pathlib.Path,
     files = list(dirpath.glob(base + ".*"))
     return files[0], video_title
 
-def _ensure_size(path: pathlib.Path, max_bytes: int, kind: str) -> pathlib.Path:
-    if path.stat().st_size <= max_bytes:
+def _ensure_size(path: pathlib.Path, max_bytes: int, kind: str, trace: Optional[dict] = None) -> pathlib.Path:
+    size = path.stat().st_size
+    if size <= max_bytes:
         return path
     if not _has_ffmpeg():
         return path
@@ -294,7 +459,11 @@ def _ensure_size(path: pathlib.Path, max_bytes: int, kind: str) -> pathlib.Path:
             "128k",
             str(out),
         ]
-    subprocess.run(cmd, check=True)
+    with _trace_stage(trace, "transcode") as stage:
+        stage["kind"] = kind
+        stage["input_bytes"] = size
+        subprocess.run(cmd, check=True)
+        stage["output_bytes"] = out.stat().st_size if out.exists() else None
     return out if out.exists() else path
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -440,28 +609,36 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
     context.user_data["pending_url"] = url
     await update.message.reply_text("Choose an action:", reply_markup=_build_menu())
 
-async def _send_video(chat_id: int, path: pathlib.Path, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def _send_video(chat_id: int, path: pathlib.Path, context: ContextTypes.DEFAULT_TYPE, trace: Optional[dict] = None) -> None:
     await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.UPLOAD_VIDEO)
-    with path.open("rb") as f:
-        await context.bot.send_video(chat_id=chat_id, video=InputFile(f, filename=path.name))
+    with _trace_stage(trace, "upload") as stage:
+        stage["bytes"] = path.stat().st_size
+        with path.open("rb") as f:
+            await context.bot.send_video(chat_id=chat_id, video=InputFile(f, filename=path.name))
 
-async def _send_audio(chat_id: int, path: pathlib.Path, context: ContextTypes.DEFAULT_TYPE) -> None:
+async def _send_audio(chat_id: int, path: pathlib.Path, context: ContextTypes.DEFAULT_TYPE, trace: Optional[dict] = None) -> None:
     await context.bot.send_chat_action(chat_id=chat_id, action=ChatAction.UPLOAD_DOCUMENT)
-    with path.open("rb") as f:
-        await context.bot.send_audio(chat_id=chat_id, audio=InputFile(f, filename=path.name))
+    with _trace_stage(trace, "upload") as stage:
+        stage["bytes"] = path.stat().st_size
+        with path.open("rb") as f:
+            await context.bot.send_audio(chat_id=chat_id, audio=InputFile(f, filename=path.name))
 
-def _openai_transcribe(path: pathlib.Path) -> Optional[str]:
+def _openai_transcribe(path: pathlib.Path, trace: Optional[dict] = None) -> Optional[str]:
     key = _get_token("OPENAI_API_KEY")
     if not key:
         return None
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=key)
-        with path.open("rb") as f:
-            res = client.audio.transcriptions.create(model="whisper-1", file=f)
-        return getattr(res, "text", None) or getattr(res, "transcription", None)
-    except Exception:
-        return None
+    with _trace_stage(trace, "transcribe") as stage:
+        stage["bytes"] = path.stat().st_size
+        try:
+            from openai import OpenAI
+            client = OpenAI(api_key=key)
+            with path.open("rb") as f:
+                res = client.audio.transcriptions.create(model="whisper-1", file=f)
+            return getattr(res, "text", None) or getattr(res, "transcription", None)
+        except Exception as e:
+            # Transcription failures are reported as "unavailable"; keep the cause in the trace
+            stage["error"] = str(e)
+            return None
 
 async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
@@ -486,116 +663,91 @@ async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     # Send initial message to inform user about download start
     initial_msg = await query.message.reply_text("📥 Starting download...")
     
+    trace = _new_trace(query.data, url, query.message.chat_id)
+    error = None
     tmp = _tmp_dir()
     try:
         if query.data in ["action_video", "action_video_hd"]:
-            p, video_title = _download_video(url, tmp)
+            p, video_title = _download_video(url, tmp, trace)
             # Update message with video title
             await initial_msg.edit_text(f"🎬 Video: {video_title}\n📊 Download complete, preparing to send...")
-            p2 = _ensure_size(p, 48 * 1024 * 1024, "video")
-            await _send_video(query.message.chat_id, p2, context)
+            p2 = _ensure_size(p, 48 * 1024 * 1024, "video", trace)
+            await _send_video(query.message.chat_id, p2, context, trace)
         elif query.data == "action_video_sd":
             # SD video format with lower resolution
             base = _sanitize_filename(str(uuid.uuid4()))
             outtmpl = str(tmp / (base + ".%(ext)s"))
             
-            def progress_hook(d):
-                if d['status'] == 'downloading':
-                    percent = d.get('_percent_str', 'Unknown')
-                    speed = d.get('_speed_str', 'Unknown')
-                    eta = d.get('_eta_str', 'Unknown')
-                    print(f"Downloading: {percent} at {speed}, ETA: {eta}")
-            
             ydl_opts = {
                 "format": "bestvideo[height<=360][ext=mp4]+bestaudio/best[height<=360][ext=mp4]/best[height<=360]",
                 "merge_output_format": "mp4",
                 "outtmpl": outtmpl,
                 "noplaylist": True,
                 "quiet": True,
-                "progress_hooks": [progress_hook],
             }
             
-            video_title = "Unknown Title"
-            with YoutubeDL(ydl_opts) as ydl:
-                # Extract video info first to get the title
-                info = ydl.extract_info(url, download=False)
-                video_title = info.get('title', 'Unknown Title')
-                # Now download the video
-                ydl.download([url])
+            video_title = _run_ydl(url, ydl_opts, trace)
             
             files = list(tmp.glob(base + ".*"))
             p = files[0]
             
             # Update message with video title
             await initial_msg.edit_text(f"🎬 Video: {video_title}\n📊 Download complete, preparing to send...")
-            p2 = _ensure_size(p, 48 * 1024 * 1024, "video")
-            await _send_video(query.message.chat_id, p2, context)
+            p2 = _ensure_size(p, 48 * 1024 * 1024, "video", trace)
+            await _send_video(query.message.chat_id, p2, context, trace)
         elif query.data == "action_video_low":
             # Low quality video format
             base = _sanitize_filename(str(uuid.uuid4()))
             outtmpl = str(tmp / (base + ".%(ext)s"))
             
-            def progress_hook(d):
-                if d['status'] == 'downloading':
-                    percent = d.get('_percent_str', 'Unknown')
-                    speed = d.get('_speed_str', 'Unknown')
-                    eta = d.get('_eta_str', 'Unknown')
-                    print(f"Downloading: {percent} at {speed}, ETA: {eta}")
-            
             ydl_opts = {
                 "format": "bestvideo[height<=240][ext=mp4]+bestaudio/best[height<=240][ext=mp4]/best[height<=240]",
                 "merge_output_format": "mp4",
                 "outtmpl": outtmpl,
                 "noplaylist": True,
                 "quiet": True,
-                "progress_hooks": [progress_hook],
             }
             
-            video_title = "Unknown Title"
-            with YoutubeDL(ydl_opts) as ydl:
-                # Extract video info first to get the title
-                info = ydl.extract_info(url, download=False)
-                video_title = info.get('title', 'Unknown Title')
-                # Now download the video
-                ydl.download([url])
+            video_title = _run_ydl(url, ydl_opts, trace)
             
             files = list(tmp.glob(base + ".*"))
             p = files[0]
             
             # Update message with video title
             await initial_msg.edit_text(f"🎬 Video: {video_title}\n📊 Download complete, preparing to send...")
-            p2 = _ensure_size(p, 48 * 1024 * 1024, "video")
-            await _send_video(query.message.chat_id, p2, context)
+            p2 = _ensure_size(p, 48 * 1024 * 1024, "video", trace)
+            await _send_video(query.message.chat_id, p2, context, trace)
         elif query.data in ["action_audio", "action_audio_high"]:
-            p, video_title = _download_audio_high(url, tmp)
+            p, video_title = _download_audio_high(url, tmp, trace)
             # Update message with audio title
             await initial_msg.edit_text(f"🎵 Audio: {video_title}\n📊 Download complete, preparing to send...")
-            p2 = _ensure_size(p, 48 * 1024 * 1024, "audio")
-            await _send_audio(query.message.chat_id, p2, context)
+            p2 = _ensure_size(p, 48 * 1024 * 1024, "audio", trace)
+            await _send_audio(query.message.chat_id, p2, context, trace)
         elif query.data == "action_audio_medium":
-            p, video_title = _download_audio_medium(url, tmp)
+            p, video_title = _download_audio_medium(url, tmp, trace)
             # Update message with audio title
             await initial_msg.edit_text(f"🎵 Audio: {video_title}\n📊 Download complete, preparing to send...")
-            p2 = _ensure_size(p, 48 * 1024 * 1024, "audio")
-            await _send_audio(query.message.chat_id, p2, context)
+            p2 = _ensure_size(p, 48 * 1024 * 1024, "audio", trace)
+            await _send_audio(query.message.chat_id, p2, context, trace)
         elif query.data == "action_audio_low":
-            p, video_title = _download_audio_low(url, tmp)
+            p, video_title = _download_audio_low(url, tmp, trace)
             # Update message with audio title
             await initial_msg.edit_text(f"🎵 Audio: {video_title}\n📊 Download complete, preparing to send...")
-            p2 = _ensure_size(p, 48 * 1024 * 1024, "audio")
-            await _send_audio(query.message.chat_id, p2, context)
+            p2 = _ensure_size(p, 48 * 1024 * 1024, "audio", trace)
+            await _send_audio(query.message.chat_id, p2, context, trace)
         elif query.data == "action_transcribe":
-            a, video_title = _download_audio_high(url, tmp)
+            a, video_title = _download_audio_high(url, tmp, trace)
             # Update message with transcription info
             await initial_msg.edit_text(f"📝 Transcribing: {video_title}\n📊 Processing audio for transcription...")
-            a2 = _ensure_size(a, 48 * 1024 * 1024, "audio")
-            text = _openai_transcribe(a2)
+            a2 = _ensure_size(a, 48 * 1024 * 1024, "audio", trace)
+            text = _openai_transcribe(a2, trace)
             if text:
                 await query.message.reply_text(text)
             else:
                 await query.message.reply_text("Transcription unavailable. Set OPENAI_API_KEY.")
     except Exception as e:
-        await query.message.reply_text(f"❌ Error occurred: {str(e)}")
+        error = str(e)
+        await query.message.reply_text(f"❌ Error occurred: {error}\n🔎 Job ID: {trace['job_id']}")
     finally:
         # Clean up temp files
         for f in tmp.glob("*"):
@@ -612,6 +764,7 @@ async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
             await initial_msg.delete()
         except Exception:
             pass
+        _finish_trace(trace, error)
 
 def main() -> None:
     print("🚀 Starting Instagram & YouTube Link Converter Bot...")